@@ -1,6 +1,12 @@
 # archive.py
+import mmap
+import operator
 import os
+import struct
 import time
+import zlib
+from contextlib import ExitStack
+from itertools import compress, repeat
 
 CATALOG_FILE = "catalog.txt"
 OUTPUT_FILE = "output.txt"
@@ -8,6 +14,20 @@ LOG_FILE = "log.csv"
 MAX_RECORDS_PER_PAGE = 10
 MAX_PAGES_PER_FILE = 100
 FIELD_SIZE = 25  # Fixed size for all fields (int or str)
+INT_COLUMN_FORMAT = 'q'  # Columnar ints are packed native int64
+INT_COLUMN_SIZE = struct.calcsize(INT_COLUMN_FORMAT)
+INT_COLUMN_MIN = -2 ** (INT_COLUMN_SIZE * 8 - 1)
+INT_COLUMN_MAX = 2 ** (INT_COLUMN_SIZE * 8 - 1) - 1
+STR_COLUMN_SIZE = 4 * FIELD_SIZE  # FIELD_SIZE characters of up to 4 UTF-8 bytes each
+AGGREGATE_FUNCTIONS = ('count', 'sum', 'min', 'max', 'avg')
+FILTER_OPERATORS = {
+    '=': operator.eq,
+    '!=': operator.ne,
+    '<': operator.lt,
+    '<=': operator.le,
+    '>': operator.gt,
+    '>=': operator.ge,
+}
 
 class TypeDefinition:
     def __init__(self, name, num_fields, primary_key_index, fields):
@@ -139,14 +159,17 @@ class RecordManager:
         self.td = td
         self.file_path = f"{td.name}.txt"
 
+    def format_value(self, value, ftype):
+        if ftype == 'int':
+            if not value.lstrip('-').isdigit():
+                raise ValueError(f"Invalid integer value: {value}")
+            value = str(int(value))
+        return value
+
     def format_record(self, values):
         record = '1'  # Validity flag
         for (value, (_, ftype, _)) in zip(values, self.td.fields):
-            if ftype == 'int':
-                if not value.lstrip('-').isdigit():
-                    raise ValueError(f"Invalid integer value: {value}")
-                value = str(int(value))
-            record += value.ljust(FIELD_SIZE)
+            record += self.format_value(value, ftype).ljust(FIELD_SIZE)
         return record
 
     def parse_record(self, record_str):
@@ -254,6 +277,75 @@ class RecordManager:
                 page_number += 1
         return False
 
+    def find_slot(self, pk, other_pk=None):
+        """Locate pk in a single scan of the file.
+
+        Returns (location, other_exists). location is None when pk is missing,
+        otherwise (page, slot, byte offset of the slot, byte length of the slot,
+        parsed values). other_exists tells whether a record with other_pk exists.
+        """
+        location = None
+        other_exists = False
+        if not os.path.exists(self.file_path):
+            return location, other_exists
+        with open(self.file_path, 'rb') as f:
+            offset = 0
+            for raw_line in f:
+                line = raw_line.rstrip(b'\r\n').decode('utf-8')
+                line_offset = offset
+                offset += len(raw_line)
+                if not line.strip():
+                    continue
+                page = Page.deserialize(line, self.td.record_size)
+                parts = line.split('|', 3)
+                header, content = '|'.join(parts[:3]) + '|', parts[3]
+                for i in range(page.max_records):
+                    if page.bitmap[i] == 1:
+                        parsed = self.parse_record(page.records[i])
+                        if not parsed:
+                            continue
+                        record_pk = self.get_primary_key(parsed)
+                        if record_pk == other_pk:
+                            other_exists = True
+                        if record_pk == pk:
+                            start = i * self.td.record_size
+                            slot_offset = line_offset + len(header.encode('utf-8')) + len(content[:start].encode('utf-8'))
+                            slot_length = len(page.records[i].encode('utf-8'))
+                            location = (page, i, slot_offset, slot_length, parsed)
+                        if location and (other_pk is None or other_exists):
+                            return location, other_exists
+        return location, other_exists
+
+    def update_record(self, pk, changes):
+        field_names = [fname for fname, _, _ in self.td.fields]
+        for fname in changes:
+            if fname not in field_names:
+                raise ValueError(f"Unknown field: {fname}")
+        pk_name, pk_type, _ = self.td.fields[self.td.primary_key_index]
+        new_pk = pk
+        if pk_name in changes:
+            new_pk = self.format_value(changes[pk_name], pk_type)
+        location, new_pk_exists = self.find_slot(pk, new_pk if new_pk != pk else None)
+        if location is None or new_pk_exists:
+            return False
+        page, slot, slot_offset, slot_length, values = location
+        for fname, value in changes.items():
+            values[field_names.index(fname)] = value
+        record = self.format_record(values)
+        if len(record) != self.td.record_size:
+            raise ValueError(f"Value longer than {FIELD_SIZE} characters")
+        encoded = record.encode('utf-8')
+        if len(encoded) != slot_length:
+            # Multi-byte characters changed the slot's byte length, so the
+            # page line has to be rewritten instead of patched in place.
+            page.records[slot] = record
+            self.write_page(page)
+            return True
+        with open(self.file_path, 'r+b') as f:
+            f.seek(slot_offset)
+            f.write(encoded)
+        return True
+
     def search_record(self, pk):
         if not os.path.exists(self.file_path):
             return None
@@ -273,6 +365,181 @@ class RecordManager:
                 page_number += 1
         return None
 
+class ColumnarSnapshot:
+    """Column-per-field copy of a type's data file for fast aggregates.
+
+    Row ``page_number * MAX_RECORDS_PER_PAGE + slot`` in every column holds
+    that slot of the row file. ``_valid.col`` stores one byte per row (1 =
+    occupied). Int columns store packed int64 values next to a
+    ``<field>.present.col`` byte column that is 0 for empty slots and for
+    values outside the int64 range (NULL); aggregates skip NULLs. Str columns
+    store NUL-padded UTF-8 values of STR_COLUMN_SIZE bytes. ``manifest.txt``
+    keeps a CRC per page so a refresh only rewrites the rows of pages that
+    changed.
+    """
+
+    def __init__(self, td: TypeDefinition):
+        self.td = td
+        self.rm = RecordManager(td)
+        self.dir_path = f"{td.name}_columnar"
+        self.manifest_path = os.path.join(self.dir_path, "manifest.txt")
+        self.validity_path = os.path.join(self.dir_path, "_valid.col")
+
+    def column_path(self, field_name):
+        return os.path.join(self.dir_path, f"{field_name}.col")
+
+    def present_path(self, field_name):
+        return os.path.join(self.dir_path, f"{field_name}.present.col")
+
+    def get_field(self, field_name):
+        for index, (fname, ftype, _) in enumerate(self.td.fields):
+            if fname == field_name:
+                return index, ftype
+        raise ValueError(f"Unknown field: {field_name}")
+
+    def columns(self):
+        columns = [(self.validity_path, 1)]
+        for fname, ftype, _ in self.td.fields:
+            if ftype == 'int':
+                columns.append((self.column_path(fname), INT_COLUMN_SIZE))
+                columns.append((self.present_path(fname), 1))
+            else:
+                columns.append((self.column_path(fname), STR_COLUMN_SIZE))
+        return columns
+
+    def load_manifest(self):
+        checksums = {}
+        if os.path.exists(self.manifest_path):
+            with open(self.manifest_path, 'r') as f:
+                for line in f:
+                    if line.strip():
+                        page_number, checksum = line.strip().split('|')
+                        checksums[int(page_number)] = int(checksum)
+        return checksums
+
+    def encode_row(self, values):
+        if values is None:
+            return [b'\x00' * width for _, width in self.columns()]
+        encoded = [b'\x01']
+        for value, (_, ftype, _) in zip(values, self.td.fields):
+            if ftype == 'int':
+                number = int(value)
+                if INT_COLUMN_MIN <= number <= INT_COLUMN_MAX:
+                    encoded.append(struct.pack(INT_COLUMN_FORMAT, number))
+                    encoded.append(b'\x01')
+                else:
+                    encoded.append(b'\x00' * INT_COLUMN_SIZE)
+                    encoded.append(b'\x00')
+            else:
+                # parse_record yields at most FIELD_SIZE characters, which always fit.
+                encoded.append(value.encode('utf-8').ljust(STR_COLUMN_SIZE, b'\x00'))
+        return encoded
+
+    def refresh(self):
+        """Bring the column files up to date; returns the number of pages rewritten."""
+        os.makedirs(self.dir_path, exist_ok=True)
+        columns = self.columns()
+        old_checksums = self.load_manifest()
+        if not all(os.path.exists(path) for path, _ in columns):
+            old_checksums = {}
+        pages = {}
+        if os.path.exists(self.rm.file_path):
+            with open(self.rm.file_path, 'r') as f:
+                for line in f:
+                    line = line.strip()
+                    if line:
+                        pages[int(line.split('|')[0])] = line
+        num_pages = max(pages) + 1 if pages else 0
+        num_rows = num_pages * MAX_RECORDS_PER_PAGE
+        checksums = {pn: zlib.crc32(line.encode('utf-8')) for pn, line in pages.items()}
+        changed = [pn for pn in range(num_pages) if checksums.get(pn) != old_checksums.get(pn)]
+        with ExitStack() as stack:
+            handles = []
+            for path, width in columns:
+                handle = stack.enter_context(open(path, 'r+b' if os.path.exists(path) else 'w+b'))
+                handle.truncate(num_rows * width)
+                handles.append(handle)
+            for page_number in changed:
+                page = None
+                if page_number in pages:
+                    page = Page.deserialize(pages[page_number], self.td.record_size)
+                for slot in range(MAX_RECORDS_PER_PAGE):
+                    values = None
+                    if page is not None:
+                        values = self.rm.parse_record(page.get_record(slot))
+                    row = page_number * MAX_RECORDS_PER_PAGE + slot
+                    for handle, (_, width), data in zip(handles, columns, self.encode_row(values)):
+                        handle.seek(row * width)
+                        handle.write(data)
+        with open(self.manifest_path, 'w') as f:
+            for page_number in sorted(checksums):
+                f.write(f"{page_number}|{checksums[page_number]}\n")
+        return len(changed)
+
+    def map_column(self, stack, path, fmt):
+        f = stack.enter_context(open(path, 'rb'))
+        if os.fstat(f.fileno()).st_size == 0:
+            return memoryview(b'').cast(fmt)
+        mm = stack.enter_context(mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ))
+        raw = stack.enter_context(memoryview(mm))
+        return stack.enter_context(raw.cast(fmt))
+
+    def filter_mask(self, stack, field_name, op, operand):
+        """Return one byte per row, 1 where the row's value satisfies the filter."""
+        _, ftype = self.get_field(field_name)
+        compare = FILTER_OPERATORS[op]
+        if ftype == 'int':
+            if not operand.lstrip('-').isdigit():
+                raise ValueError(f"Invalid integer value: {operand}")
+            values = self.map_column(stack, self.column_path(field_name), INT_COLUMN_FORMAT)
+            matches = bytes(map(compare, values, repeat(int(operand))))
+            present = self.map_column(stack, self.present_path(field_name), 'B')
+            return bytes(map(operator.and_, matches, present))
+        view = self.map_column(stack, self.column_path(field_name), 'B')
+        values = map(operator.itemgetter(0), struct.iter_unpack(f"{STR_COLUMN_SIZE}s", view))
+        padded = operand.encode('utf-8').ljust(STR_COLUMN_SIZE, b'\x00')
+        return bytes(map(compare, values, repeat(padded)))
+
+    def aggregate(self, function, field_name=None, condition=None):
+        """Evaluate count/sum/min/max/avg over the snapshot.
+
+        ``condition`` is an optional ``(field, operator, value)`` filter.
+        Returns None when min/max/avg have no matching rows.
+        """
+        if function not in AGGREGATE_FUNCTIONS:
+            raise ValueError(f"Unknown aggregate function: {function}")
+        field_type = None
+        if field_name is not None:
+            field_type = self.get_field(field_name)[1]
+        if function != 'count':
+            if field_name is None:
+                raise ValueError(f"{function} requires a field")
+            if field_type != 'int':
+                raise ValueError(f"{function} requires an int field: {field_name}")
+        if condition is not None and condition[1] not in FILTER_OPERATORS:
+            raise ValueError(f"Unknown filter operator: {condition[1]}")
+        self.refresh()
+        with ExitStack() as stack:
+            mask = bytes(self.map_column(stack, self.validity_path, 'B'))
+            if condition is not None:
+                mask = bytes(map(operator.and_, mask, self.filter_mask(stack, *condition)))
+            if field_type == 'int':
+                present = self.map_column(stack, self.present_path(field_name), 'B')
+                mask = bytes(map(operator.and_, mask, present))
+            if function == 'count':
+                return mask.count(1)
+            column = self.map_column(stack, self.column_path(field_name), INT_COLUMN_FORMAT)
+            values = list(compress(column, mask))
+        if function == 'sum':
+            return sum(values)
+        if not values:
+            return None
+        if function == 'min':
+            return min(values)
+        if function == 'max':
+            return max(values)
+        return sum(values) / len(values)
+
 if __name__ == '__main__':
     import sys
     input_file = sys.argv[1] if len(sys.argv) > 1 else 'input.txt'
@@ -340,6 +607,51 @@ if __name__ == '__main__':
                         logger.log(line, 'success')
                     else:
                         logger.log(line, 'failure')
+                elif command == 'update' and parts[1] == 'record':
+                    type_name = parts[2]
+                    pk = parts[3]
+                    changes = {}
+                    for assignment in parts[4:]:
+                        fname, value = assignment.split('=', 1)
+                        changes[fname] = value
+                    if not changes or not catalog.has_type(type_name):
+                        logger.log(line, 'failure')
+                        continue
+                    td = catalog.get_type(type_name)
+                    rm = RecordManager(td)
+                    if rm.update_record(pk, changes):
+                        logger.log(line, 'success')
+                    else:
+                        logger.log(line, 'failure')
+                elif command == 'export' and parts[2] == 'columnar':
+                    type_name = parts[1]
+                    if not catalog.has_type(type_name):
+                        logger.log(line, 'failure')
+                        continue
+                    ColumnarSnapshot(catalog.get_type(type_name)).refresh()
+                    logger.log(line, 'success')
+                elif command == 'aggregate':
+                    type_name = parts[1]
+                    function = parts[2]
+                    rest = parts[3:]
+                    field_name = None
+                    condition = None
+                    if rest and rest[0] != 'where':
+                        field_name = rest.pop(0)
+                    if rest:
+                        if len(rest) != 4 or rest[0] != 'where':
+                            raise ValueError(f"Invalid aggregate filter: {' '.join(rest)}")
+                        condition = tuple(rest[1:])
+                    if not catalog.has_type(type_name):
+                        logger.log(line, 'failure')
+                        continue
+                    snapshot = ColumnarSnapshot(catalog.get_type(type_name))
+                    result = snapshot.aggregate(function, field_name, condition)
+                    if result is None:
+                        logger.log(line, 'failure')
+                    else:
+                        output.write(f"{result:.2f}" if function == 'avg' else str(result))
+                        logger.log(line, 'success')
                 else:
                     logger.log(line, 'failure')
             except Exception:
@@ -0,0 +1,97 @@
+import os
+
+import pytest
+
+from archive import FIELD_SIZE, ColumnarSnapshot, RecordManager, TypeDefinition
+
+HOUSE_FIELDS = [
+    ('name', 'str', FIELD_SIZE),
+    ('origin', 'str', FIELD_SIZE),
+    ('leader', 'str', FIELD_SIZE),
+    ('military_strength', 'int', FIELD_SIZE),
+    ('wealth', 'int', FIELD_SIZE),
+    ('spice_production', 'int', FIELD_SIZE),
+]
+
+
+@pytest.fixture
+def houses(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    rm = RecordManager(TypeDefinition('house', 6, 0, HOUSE_FIELDS))
+    rm.create_record(['Atreides', 'Caladan', 'Duke', '8000', '5000', '150'])
+    rm.create_record(['Harkonnen', 'GiediPrime', 'Baron', '12000', '3000', '200'])
+    return rm
+
+
+def test_update_record_in_place(houses):
+    assert houses.update_record('Atreides', {'wealth': '6000', 'leader': 'Paul'})
+    assert houses.search_record('Atreides') == ['Atreides', 'Caladan', 'Paul', '8000', '6000', '150']
+    assert houses.search_record('Harkonnen') == ['Harkonnen', 'GiediPrime', 'Baron', '12000', '3000', '200']
+
+
+def test_update_record_non_ascii_keeps_neighbour(houses):
+    assert houses.update_record('Atreides', {'leader': 'Pául'})
+    assert houses.search_record('Atreides')[2] == 'Pául'
+    assert houses.search_record('Harkonnen') == ['Harkonnen', 'GiediPrime', 'Baron', '12000', '3000', '200']
+    assert houses.update_record('Atreides', {'leader': 'Paul'})
+    assert houses.search_record('Atreides')[2] == 'Paul'
+    assert houses.search_record('Harkonnen') == ['Harkonnen', 'GiediPrime', 'Baron', '12000', '3000', '200']
+
+
+def test_update_record_primary_key(houses):
+    assert not houses.update_record('Harkonnen', {'name': 'Atreides'})
+    assert houses.update_record('Harkonnen', {'name': 'Vernius'})
+    assert houses.search_record('Harkonnen') is None
+    assert houses.search_record('Vernius')[0] == 'Vernius'
+    assert not houses.update_record('Corrino', {'wealth': '1'})
+
+
+def test_update_record_rejects_invalid_values(houses):
+    with pytest.raises(ValueError):
+        houses.update_record('Atreides', {'wealth': 'abc'})
+    with pytest.raises(ValueError):
+        houses.update_record('Atreides', {'bogus': '1'})
+    assert houses.search_record('Atreides')[4] == '5000'
+
+
+def test_aggregate_filters(houses):
+    snapshot = ColumnarSnapshot(houses.td)
+    assert snapshot.aggregate('count') == 2
+    assert snapshot.aggregate('sum', 'spice_production') == 350
+    assert snapshot.aggregate('avg', 'wealth', ('origin', '!=', 'Caladan')) == 3000
+    assert snapshot.aggregate('max', 'military_strength', ('spice_production', '<', '200')) == 8000
+    assert snapshot.aggregate('count', None, ('origin', '<', 'D')) == 1
+    assert snapshot.aggregate('min', 'wealth', ('name', '=', 'Corrino')) is None
+
+
+def test_aggregate_non_ascii_and_out_of_range_values(houses):
+    houses.create_record(['Vernius', 'É' * 15, 'Earl', '1', '1', '1'])
+    houses.create_record(['Big', 'Émile', 'X', '99999999999999999999', '7', '10'])
+    snapshot = ColumnarSnapshot(houses.td)
+    assert snapshot.aggregate('count', None, ('origin', '=', 'Caladan')) == 1
+    assert snapshot.aggregate('count', None, ('origin', '=', 'É' * 15)) == 1
+    assert snapshot.aggregate('count') == 4
+    assert snapshot.aggregate('count', 'military_strength') == 3
+    assert snapshot.aggregate('max', 'military_strength') == 12000
+    assert snapshot.aggregate('sum', 'spice_production', ('military_strength', '>', '10')) == 350
+
+
+def test_snapshot_refresh_is_incremental(houses):
+    snapshot = ColumnarSnapshot(houses.td)
+    assert snapshot.refresh() == 1
+    assert snapshot.refresh() == 0
+    for i in range(12):
+        houses.create_record([f'House{i}', 'x', 'y', '1', '2', '3'])
+    assert snapshot.refresh() == 2
+    assert houses.update_record('Atreides', {'spice_production': '1000'})
+    assert snapshot.aggregate('sum', 'spice_production') == 1236
+
+
+def test_aggregate_sees_update_with_unchanged_mtime(houses):
+    snapshot = ColumnarSnapshot(houses.td)
+    assert snapshot.refresh() == 1
+    stat = os.stat(houses.file_path)
+    assert houses.update_record('Atreides', {'spice_production': '999'})
+    os.utime(houses.file_path, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+    assert os.path.getsize(houses.file_path) == stat.st_size
+    assert snapshot.aggregate('sum', 'spice_production') == 1199